@@ -31,6 +31,7 @@ requirements = [
     "thewalrus>=0.14.0",
     "numba",
     "toml",
+    "tomli; python_version < '3.11'",
     "appdirs",
     "requests>=2.22.0",
     "urllib3>=1.25.3",
@@ -44,6 +44,7 @@ class DeviceSpec:
         self._target = target
         self._connection = connection
         self._spec = spec
+        self._layout_program = None
 
     @property
     def target(self):
@@ -55,6 +56,17 @@ class DeviceSpec:
         """str: Returns a string containing the Blackbird circuit layout."""
         return self._spec["layout"]
 
+    @property
+    def layout_program(self):
+        """blackbird.BlackbirdProgram: The Blackbird circuit layout, parsed into a template.
+
+        The layout is only parsed the first time it is accessed, and the parsed
+        template is reused afterwards.
+        """
+        if self._layout_program is None:
+            self._layout_program = blackbird.loads(self.layout)
+        return self._layout_program
+
     @property
     def modes(self):
         """int: Number of modes supported by the device."""
@@ -103,16 +115,17 @@ class DeviceSpec:
         Gate parameters should be passed as keyword arguments, with names
         correspond to those present in the Blackbird circuit layout.
         """
+        # the allowed ranges are rebuilt on each access, so only retrieve them once
+        gate_parameters = self.gate_parameters
+
         # check that all provided parameters are valid
         for p, v in parameters.items():
-            if p in self.gate_parameters and v not in self.gate_parameters[p]:
+            if p in gate_parameters and v not in gate_parameters[p]:
                 # parameter is present in the device specifications
                 # but the user has provided a disallowed value
-                raise ValueError(
-                    f"{p} has invalid value {v}. Only {self.gate_parameters[p]} allowed."
-                )
+                raise ValueError(f"{p} has invalid value {v}. Only {gate_parameters[p]} allowed.")
 
-            if p not in self.gate_parameters:
+            if p not in gate_parameters:
                 raise ValueError(f"Parameter {p} not a valid parameter for this device")
 
     def create_program(self, **parameters):
@@ -137,16 +150,17 @@ class DeviceSpec:
         Returns:
             strawberryfields.program.Program: program compiled to the device
         """
-        bb = blackbird.loads(self.layout)
+        bb = self.layout_program
         self.validate_parameters(**parameters)
 
         # determine parameter value if not provided
-        extra_params = set(self.gate_parameters) - set(parameters)
+        gate_parameters = self.gate_parameters
+        extra_params = set(gate_parameters) - set(parameters)
 
         for p in extra_params:
             # Set parameter value as the first allowed
             # value in the gate parameters dictionary.
-            parameters[p] = self.gate_parameters[p].ranges[0].x
+            parameters[p] = gate_parameters[p].ranges[0].x
 
         # evaluate the blackbird template
         bb = bb(**parameters)
@@ -157,3 +171,4 @@ class DeviceSpec:
     def refresh(self):
         """Refreshes the device specifications"""
         self._spec = self._connection._get_device_dict(self.target)
+        self._layout_program = None
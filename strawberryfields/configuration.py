@@ -15,7 +15,18 @@ r"""
 This module contains functions used to load, store, save, and modify
 configuration options for Strawberry Fields.
 """
+import copy
+import errno
 import os
+import stat
+import sys
+import tempfile
+
+try:
+    import tomllib
+except ImportError:  # pragma: no cover
+    # tomllib was added to the standard library in Python 3.11
+    import tomli as tomllib
 
 import toml
 from appdirs import user_config_dir
@@ -31,6 +42,27 @@ DEFAULT_CONFIG_SPEC = {
     }
 }
 
+VALID_KEYS = frozenset(DEFAULT_CONFIG_SPEC["api"])
+
+# flat lookup table of the default values of the api options
+_API_DEFAULTS = {key: spec[1] for key, spec in DEFAULT_CONFIG_SPEC["api"].items()}
+
+# mapping of the environment variable names to the configuration sections and
+# keys; the names are built at runtime and are therefore interned explicitly
+ENV_VARIABLES = {
+    sys.intern("SF_{}_{}".format(section.upper(), key.upper())): (section, key)
+    for section, sectionconfig in DEFAULT_CONFIG_SPEC.items()
+    for key in sectionconfig
+}
+
+# values accepted for boolean options set through environment variables
+BOOLEAN_TRUE_VALUES = frozenset({True, "true", "True", "TRUE", "1"})
+BOOLEAN_FALSE_VALUES = frozenset({False, "false", "False", "FALSE", "0"})
+
+# parsed configuration files, keyed by path and stored together with the
+# modification time and size of the file at the time it was parsed
+_CONFIG_FILE_CACHE = {}
+
 
 class ConfigurationError(Exception):
     """Exception used for configuration errors"""
@@ -59,6 +91,7 @@ def load_config(filename="config.toml", **kwargs):
         dict[str, dict[str, Union[str, bool, int]]]: the configuration
     """
     config = create_config()
+    api = config["api"]
 
     filepath = find_config_file(filename=filename)
 
@@ -67,7 +100,7 @@ def load_config(filename="config.toml", **kwargs):
         api_config = get_api_config(loaded_config, filepath)
 
         valid_api_options = keep_valid_options(api_config)
-        config["api"].update(valid_api_options)
+        api.update(valid_api_options)
     else:
         log = create_logger(__name__)
         log.warning("No Strawberry Fields configuration file found.")
@@ -75,7 +108,7 @@ def load_config(filename="config.toml", **kwargs):
     update_from_environment_variables(config)
 
     valid_kwargs_config = keep_valid_options(kwargs)
-    config["api"].update(valid_kwargs_config)
+    api.update(valid_kwargs_config)
 
     return config
 
@@ -97,19 +130,11 @@ def create_config(authentication_token=None, **kwargs):
         dict[str, dict[str, Union[str, bool, int]]]: the configuration
             object
     """
-    authentication_token = authentication_token or ""
-    hostname = kwargs.get("hostname", DEFAULT_CONFIG_SPEC["api"]["hostname"][1])
-    use_ssl = kwargs.get("use_ssl", DEFAULT_CONFIG_SPEC["api"]["use_ssl"][1])
-    port = kwargs.get("port", DEFAULT_CONFIG_SPEC["api"]["port"][1])
-
-    config = {
-        "api": {
-            "authentication_token": authentication_token,
-            "hostname": hostname,
-            "use_ssl": use_ssl,
-            "port": port,
-        }
-    }
+    api_config = dict(_API_DEFAULTS)
+    api_config.update(keep_valid_options(kwargs))
+    api_config["authentication_token"] = authentication_token or ""
+
+    config = {"api": api_config}
     return config
 
 
@@ -164,11 +189,14 @@ def find_config_file(filename="config.toml"):
          Union[str, None]: the filepath to the configuration file or None, if
              no file was found
     """
-    directories = directories_to_check()
-    for directory in directories:
+    for directory in _iter_directories_to_check():
         filepath = os.path.join(directory, filename)
-        if os.path.exists(filepath):
-            return filepath
+        try:
+            os.stat(filepath)
+        except OSError:
+            continue
+
+        return filepath
 
     return None
 
@@ -187,18 +215,26 @@ def directories_to_check():
     Returns:
         list: the list of directories to check
     """
-    directories = []
+    return list(_iter_directories_to_check())
 
-    current_dir = os.getcwd()
-    sf_env_config_dir = os.environ.get("SF_CONF", "")
-    sf_user_config_dir = user_config_dir("strawberryfields", "Xanadu")
 
-    directories.append(current_dir)
+def _iter_directories_to_check():
+    """Yields the directories that should be checked for a configuration file.
+
+    The directories are yielded in the same order as in :func:`directories_to_check`.
+    Each directory is only determined once the previous ones were consumed, such
+    that searches stopping at an earlier directory skip the remaining lookups.
+
+    Yields:
+        str: the next directory to check
+    """
+    yield os.getcwd()
+
+    sf_env_config_dir = os.environ.get("SF_CONF", "")
     if sf_env_config_dir != "":
-        directories.append(sf_env_config_dir)
-    directories.append(sf_user_config_dir)
+        yield sf_env_config_dir
 
-    return directories
+    yield user_config_dir("strawberryfields", "Xanadu")
 
 
 def load_config_file(filepath):
@@ -211,9 +247,23 @@ def load_config_file(filepath):
          dict[str, dict[str, Union[str, bool, int]]]: the configuration
             object that was loaded
     """
-    with open(filepath, "r") as f:
-        config_from_file = toml.load(f)
-    return config_from_file
+    filepath = os.fspath(filepath)
+
+    # reuse the parsed file if it has not been modified since it was last loaded
+    file_stat = os.stat(filepath)
+    file_key = (file_stat.st_mtime_ns, file_stat.st_size)
+
+    cached = _CONFIG_FILE_CACHE.get(filepath)
+    if cached is not None and cached[0] == file_key:
+        return copy.deepcopy(cached[1])
+
+    # configuration files are small, so read them in a single call
+    with open(filepath, "rb") as f:
+        data = f.read()
+
+    config_from_file = tomllib.loads(data.decode("utf-8"))
+    _CONFIG_FILE_CACHE[filepath] = (file_key, config_from_file)
+    return copy.deepcopy(config_from_file)
 
 
 def get_api_config(loaded_config, filepath):
@@ -250,7 +300,7 @@ def keep_valid_options(sectionconfig):
         dict[str, Union[str, bool, int]]: the keep section of the
             configuration
     """
-    return {k: v for k, v in sectionconfig.items() if k in VALID_KEYS}
+    return {k: sectionconfig[k] for k in sectionconfig.keys() & VALID_KEYS}
 
 
 def update_from_environment_variables(config):
@@ -266,12 +316,15 @@ def update_from_environment_variables(config):
         dict[str, dict[str, Union[str, bool, int]]]): the updated
         configuration
     """
-    for section, sectionconfig in config.items():
-        env_prefix = "SF_{}_".format(section.upper())
-        for key in sectionconfig:
-            env = env_prefix + key.upper()
-            if env in os.environ:
-                config[section][key] = parse_environment_variable(key, os.environ[env])
+    environ = os.environ
+    for env, (section, key) in ENV_VARIABLES.items():
+        value = environ.get(env)
+        if value is None:
+            continue
+
+        sectionconfig = config.get(section)
+        if sectionconfig is not None and key in sectionconfig:
+            sectionconfig[key] = parse_environment_variable(key, value)
 
 
 def parse_environment_variable(key, value):
@@ -285,19 +338,18 @@ def parse_environment_variable(key, value):
     Returns:
         [str, bool, int]: the parsed value
     """
-    trues = (True, "true", "True", "TRUE", "1", 1)
-    falses = (False, "false", "False", "FALSE", "0", 0)
+    value_type = DEFAULT_CONFIG_SPEC["api"][key][0]
 
-    if DEFAULT_CONFIG_SPEC["api"][key][0] is bool:
-        if value in trues:
+    if value_type is bool:
+        if value in BOOLEAN_TRUE_VALUES:
             return True
 
-        if value in falses:
+        if value in BOOLEAN_FALSE_VALUES:
             return False
 
         raise ValueError("Boolean could not be parsed")
 
-    if DEFAULT_CONFIG_SPEC["api"][key][0] is int:
+    if value_type is int:
         return int(value)
 
     return value
@@ -457,14 +509,46 @@ def store_account(authentication_token, filename="config.toml", location="user_c
 def save_config_to_file(config, filepath):
     """Saves a configuration to a TOML file.
 
+    An existing configuration file keeps its permissions, and a read-only one
+    is not overwritten. A new configuration file is only readable and writable
+    by its owner, as it may contain the authentication token.
+
     Args:
         config (dict[str, dict[str, Union[str, bool, int]]]): the
             configuration to be saved
         filepath (str): path to the configuration file
+
+    Raises:
+        PermissionError: if the configuration file exists but is not writable
     """
-    with open(filepath, "w") as f:
-        toml.dump(config, f)
+    data = toml.dumps(config)
+
+    # resolve symbolic links, such that the file they point to is updated
+    filepath = os.path.realpath(filepath)
+
+    # replacing the file would bypass its permissions, so refuse to overwrite
+    # a read-only configuration file just like opening it for writing would
+    if os.path.exists(filepath) and not os.access(filepath, os.W_OK):
+        raise PermissionError(errno.EACCES, os.strerror(errno.EACCES), filepath)
+
+    # write to a temporary file in the same directory first, such that an
+    # existing configuration file is only ever replaced by a complete one
+    directory = os.path.dirname(filepath)
+    fd, tmp_filepath = tempfile.mkstemp(suffix=".tmp", dir=directory)
+
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+
+        try:
+            os.chmod(tmp_filepath, stat.S_IMODE(os.stat(filepath).st_mode))
+        except FileNotFoundError:
+            pass
+
+        os.replace(tmp_filepath, filepath)
+    finally:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
 
 
-VALID_KEYS = set(create_config()["api"].keys())
 DEFAULT_CONFIG = create_config()
@@ -17,8 +17,12 @@ This module implements the :class:`.TDMProgram` class which acts as a representa
 """
 # pylint: disable=too-many-instance-attributes,attribute-defined-outside-init
 
-from operator import itemgetter
-from math import ceil
+from functools import lru_cache
+from itertools import accumulate, chain
+from math import ceil, gcd
+
+import numpy as np
+
 import strawberryfields as sf
 from strawberryfields import ops
 from strawberryfields.parameters import par_is_symbolic
@@ -36,23 +40,27 @@ def shift_by(l, n):
     return l[n:] + l[:n]
 
 
-def get_modes(cmd, q):
-    """Returns the registers from q required by a command.
+def _op_template(cmd):
+    """Returns the information required to apply a command at any timestep.
 
     Args:
         cmd (.Command): a Strawberryfields command
-        q (.RegRef): a register object
 
     Return:
-        modes (tuple[int]): sequence of mode labels
+        tuple[type, tuple, Union[int, None], tuple[int]]: the operation class, the operation
+        parameters, the index of the gate-parameter sequence replacing the first parameter (or
+        ``None`` if the operation is constant across all time bins), and the register indices the
+        operation acts on
     """
-    reg_getter = itemgetter(*[r.ind for r in cmd.reg])
-    modes = reg_getter(q)
+    params = tuple(cmd.op.p)
+    arg_index = None
+
+    if par_is_symbolic(params[0]):
+        arg_index = int(params[0].name[1:])
 
-    if not isinstance(modes, tuple):
-        modes = (modes,)
+    reg_inds = tuple(r.ind for r in cmd.reg)
 
-    return modes
+    return cmd.op.__class__, params, arg_index, reg_inds
 
 
 def validate_measurements(circuit, N):
@@ -75,7 +83,7 @@ def validate_measurements(circuit, N):
     if not spatial_modes:
         raise ValueError("Must be at least one measurement.")
 
-    if spatial_modes is not len(N):
+    if spatial_modes != len(N):
         raise ValueError("Number of measurement operators must match number of spatial modes.")
 
     return spatial_modes
@@ -89,9 +97,10 @@ def input_check(args, copies):
         copies (int): number of times the circuit should be run
 
     """
-    # check if all lists are of equal length
-    param_lengths = [len(param) for param in args]
-    if len(set(param_lengths)) != 1:
+    # check if all lists are of equal length, stopping at the first mismatch
+    param_lengths = map(len, args)
+    first_length = next(param_lengths, None)
+    if first_length is None or any(length != first_length for length in param_lengths):
         raise ValueError("Gate-parameter lists must be of equal length.")
 
     # check copies
@@ -99,17 +108,45 @@ def input_check(args, copies):
         raise TypeError("Number of copies must be a positive integer.")
 
 
-def _get_mode_order(num_of_values, N):
-    """Get the order by which the modes were measured"""
+@lru_cache(maxsize=None)
+def _param_names(num_params):
+    """Names of the free parameters of a :class:`~.TDMProgram` with the given number of parameters.
+
+    Args:
+        num_params (int): number of parameters
+
+    Returns:
+        tuple[str]: the parameter names ``p0, p1, ...``
+    """
+    return tuple(f"p{i}" for i in range(num_params))
+
+
+@lru_cache(maxsize=32)
+def _get_mode_pattern(N):
+    """Get the pattern by which the modes are measured, which repeats itself
+    every ``len(N) * max(N)`` measured values.
+
+    The pattern only depends on ``N`` and is therefore cached; ``N`` must be
+    passed as a tuple, and a read-only array is returned.
+
+    Args:
+        N (tuple[int]): the number of concurrent modes per belt/spatial modes
+
+    Returns:
+        array[int]: the mode measured for each of the values in a single period
+    """
+    cumulative_N = [0] + list(accumulate(N))
+    max_N = max(N)
+
     all_modes = []
-    for i in range(len(N)):
-        ra = list(range(sum(N[:i]), sum(N[: i + 1])))
-        all_modes.append(ra * ceil(max(N) / len(ra)))
+    for i, n in enumerate(N):
+        ra = list(range(cumulative_N[i], cumulative_N[i + 1]))
+        all_modes.append(ra * ceil(max_N / n))
 
-    mode_order = [i for j in zip(*all_modes) for i in j]
-    mode_order *= ceil(num_of_values / len(mode_order))
+    mode_pattern = np.fromiter(chain.from_iterable(zip(*all_modes)), dtype=int)
+    mode_pattern.flags.writeable = False
 
-    return mode_order[:num_of_values]
+    return mode_pattern
 
 
 def reshape_samples(all_samples, modes, N):
@@ -127,16 +164,35 @@ def reshape_samples(all_samples, modes, N):
     Returns:
         new_samples (dict[int, list]): the re-shaped samples
     """
-    num_of_values = len([i for j in all_samples.values() for i in j])
-    mode_order = _get_mode_order(num_of_values, N)
-
-    # go backwards through all_samples and add them into the correct mode
-    new_samples = dict()
-    for i, m in enumerate(mode_order):
-        idx = modes[i % len(N)]
-        if idx not in new_samples:
-            new_samples[idx] = []
-        new_samples[idx].append(all_samples[m].pop(0))
+    if not all_samples:
+        return {}
+
+    # concatenate the raw samples of all modes, keeping track of where each mode starts
+    offsets = np.zeros(max(all_samples) + 1, dtype=int)
+    raw_samples = []
+    for m, samples in all_samples.items():
+        offsets[m] = len(raw_samples)
+        raw_samples.extend(samples)
+
+    num_of_values = len(raw_samples)
+    mode_pattern = _get_mode_pattern(tuple(N))
+    mode_order = np.tile(mode_pattern, ceil(num_of_values / len(mode_pattern)))[:num_of_values]
+
+    # the position of each measured value among the values measured in the same mode
+    order = np.argsort(mode_order, kind="stable")
+    sorted_modes = mode_order[order]
+    positions = np.empty(num_of_values, dtype=int)
+    positions[order] = np.arange(num_of_values) - np.searchsorted(sorted_modes, sorted_modes)
+
+    # indices of the raw samples in the order they were measured
+    indices = (offsets[mode_order] + positions).tolist()
+
+    # the i-th measured value belongs to the measured mode modes[i % len(N)]
+    num_spatial_modes = len(N)
+    new_samples = {
+        modes[j]: [raw_samples[k] for k in indices[j::num_spatial_modes]]
+        for j in range(num_spatial_modes)
+    }
     return new_samples
 
 
@@ -279,7 +335,7 @@ class TDMProgram(sf.Program):
         self.copies = copies
         self.tdm_params = args
         self.shift = shift
-        self.loop_vars = self.params(*[f"p{i}" for i in range(len(args))])
+        self.loop_vars = self.params(*_param_names(len(args)))
         return self
 
     def __enter__(self):
@@ -301,16 +357,37 @@ class TDMProgram(sf.Program):
         self.timebins = len(self.tdm_params[0])
         self.total_timebins = self.timebins * self.copies
 
+        for cmd in cmds:
+            if isinstance(cmd.op, ops.Measurement):
+                self.measured_modes.append(cmd.reg[0].ind)
+
+        for op, modes in self._iter_unrolled(cmds):
+            self.append(op, modes)
+
+    def _iter_unrolled(self, cmds):
+        """Iterate over the operations of all time bins, taking the register shift into account.
+
+        The operations are created on demand, such that they can be consumed one at a time
+        without materializing the full unrolled circuit.
+
+        Args:
+            cmds (list[.Command]): the commands making up a single time bin
+
+        Yields:
+            tuple[.Operation, tuple[RegRef]]: an operation and the modes it acts on
+        """
         q = self.register
 
-        sm = []
-        for i in range(len(self.N)):
-            start = sum(self.N[:i])
-            stop = sum(self.N[:i]) + self.N[i]
-            sm.append(slice(start, stop))
+        cumulative_N = [0] + list(accumulate(self.N))
 
-        # Above we define a list of slice intervals;
-        # each slice interval corresponding to one spatial mode
+        # Instead of physically shifting the register at the end of each time bin,
+        # the shift is tracked as an offset. At time bin t, register index r is
+        # mapped to the mode
+        #
+        #     q[start + (r - start + t * step) % size],
+        #
+        # where start and size describe the band of modes that index r is
+        # shifted within, and step is the size of the shift per time bin.
 
         # For instance, say
         # N = [5, 4, 9, 1],
@@ -320,45 +397,83 @@ class TDMProgram(sf.Program):
         # 9 concurrent modes in spatial mode C
         # 1 concurrent modes in spatial mode D.
 
-        # The entries of sm will then be:
-        # slice(0, 6, None)   for spatial mode A
-        # slice(6, 10, None)  for spatial mode B
-        # slice(10, 19, None) for spatial mode C
-        # slice(19, 20, None) for spatial mode D.
+        # With the default shift, each spatial mode is shifted SEPARATELY by one
+        # step, and the bands are:
+        # start=0,  size=5 for spatial mode A
+        # start=5,  size=4 for spatial mode B
+        # start=9,  size=9 for spatial mode C
+        # start=18, size=1 for spatial mode D.
+
+        # With an integer shift, the whole register is shifted as a single band.
+        if self.shift == "default":
+            band_start = np.repeat(cumulative_N[:-1], self.N)
+            band_size = np.repeat(self.N, self.N)
+            step = 1
+        else:
+            band_start = np.zeros(self.concurr_modes, dtype=int)
+            band_size = np.full(self.concurr_modes, self.concurr_modes)
+            step = 0
+
+            # shift_by leaves the register unchanged for shifts at least as large as the register
+            if isinstance(self.shift, int) and abs(self.shift) < self.concurr_modes:
+                step = self.shift
+
+        # analyze each command only once, instead of once per time bin
+        templates = [_op_template(cmd) for cmd in cmds]
+
+        # only the register indices that the commands act on have to be tracked
+        used = np.unique(np.array([r for template in templates for r in template[3]], dtype=int))
+        columns = [np.searchsorted(used, template[3]).tolist() for template in templates]
+        band_start = band_start[used]
+        band_size = band_size[used]
+
+        # The mapping repeats itself once every band has been shifted by a whole number
+        # of turns, so only a single period of the mode table has to be computed. The
+        # table is built in one vectorized pass, with row t holding the shifted index of
+        # every used register index at time bin t.
+        period = 1
+        if step:
+            # use Python integers, since the least common multiple can overflow int64;
+            # rows beyond the last time bin are never needed
+            for size in set(band_size.tolist()):
+                period = period * size // gcd(period, size)
+                if period >= self.total_timebins:
+                    break
+        period = min(period, self.total_timebins)
+        offsets = step * np.arange(period)[:, np.newaxis]
+        table = band_start + (used - band_start + offsets) % band_size
+        table = table.tolist()
 
-        # This helps to define:
-        # q[sm[0]] as concurrent modes of spatial mode A
-        # q[sm[1]] as concurrent modes of spatial mode B
-        # q[sm[2]] as concurrent modes of spatial mode C
-        # q[sm[3]] as concurrent modes of spatial mode D.
+        for i in range(self.total_timebins):
+            row = table[i % period]
+            for template, cols in zip(templates, columns):
+                yield self._op_from_template(template, i), tuple([q[row[c]] for c in cols])
 
-        for cmd in cmds:
-            if isinstance(cmd.op, ops.Measurement):
-                self.measured_modes.append(cmd.reg[0].ind)
+    def apply_op(self, cmd, q, t):
+        """Apply a particular operation on register q at timestep t.
 
-        for i in range(self.total_timebins):
-            for cmd in cmds:
-                self.apply_op(cmd, q, i)
+        Only kept for backwards compatibility; the operations of a time bin are
+        created by :meth:`construct_circuit`, which analyzes each command only once.
+        """
+        template = _op_template(cmd)
+        self.append(self._op_from_template(template, t), tuple(q[i] for i in template[3]))
 
-            if self.shift == "default":
-                # shift each spatial mode SEPARATELY by one step
-                q_aux = list(q)
-                for j in range(len(self.N)):
-                    q_aux[sm[j]] = shift_by(q_aux[sm[j]], 1)
-                q = tuple(q_aux)
+    def _op_from_template(self, template, t):
+        """Create the operation described by an operation template at timestep t.
 
-            elif isinstance(self.shift, int):
-                q = shift_by(q, self.shift)  # shift at end of each time bin
+        Args:
+            template (tuple): operation template as returned by :func:`_op_template`
+            t (int): the timestep
 
-    def apply_op(self, cmd, q, t):
-        """Apply a particular operation on register q at timestep t"""
-        params = cmd.op.p.copy()
+        Returns:
+            .Operation: the operation to apply at timestep t
+        """
+        op_class, params, arg_index, _ = template
 
-        if par_is_symbolic(params[0]):
-            arg_index = int(params[0].name[1:])
-            params[0] = self.tdm_params[arg_index][t % self.timebins]
+        if arg_index is not None:
+            params = (self.tdm_params[arg_index][t % self.timebins],) + params[1:]
 
-        self.append(cmd.op.__class__(*params), get_modes(cmd, q))
+        return op_class(*params)
 
     def __str__(self):
         s = (
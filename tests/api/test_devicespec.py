@@ -87,6 +87,28 @@ class TestDeviceSpec:
         assert prog.name == "mock"
         assert [str(cmd) for cmd in prog.circuit] == circuit
 
+    def test_layout_program(self, monkeypatch):
+        """Test that the layout is parsed into a Blackbird template only once"""
+        spec = DeviceSpec(connection=None, spec=device_dict, target="abc")
+
+        calls = []
+        loads = blackbird.loads
+
+        def recording_loads(layout):
+            """Record the parsed layout, and parse it with blackbird.loads"""
+            calls.append(layout)
+            return loads(layout)
+
+        monkeypatch.setattr(blackbird, "loads", recording_loads)
+
+        bb = spec.layout_program
+        assert bb.is_template()
+        assert bb.name == "mock"
+
+        spec.create_program()
+        assert spec.layout_program is bb
+        assert calls == [mock_layout]
+
     @pytest.mark.parametrize(
         "params", [{"phase_0": 7.5}, {"phase_1": 0.4}, {"squeezing_amplitude_0": 0.5}]
     )
@@ -115,3 +137,15 @@ class TestDeviceSpec:
         spec.refresh()
         assert spec.modes != device_dict["modes"]
         assert spec.modes == 42
+
+    def test_refresh_layout_program(self, connection, monkeypatch):
+        """Tests that the refresh method discards the previously parsed layout"""
+        spec = DeviceSpec(connection=connection, spec=device_dict, target="abc")
+        assert spec.layout_program.name == "mock"
+
+        new_spec_dict = device_dict.copy()
+        new_spec_dict["layout"] = mock_layout.replace("name mock", "name refreshed")
+        monkeypatch.setattr(connection, "_get_device_dict", lambda target: new_spec_dict)
+
+        spec.refresh()
+        assert spec.layout_program.name == "refreshed"
@@ -215,6 +215,14 @@ def setup_eng(setup_backend_pars):  # pylint: disable=redefined-outer-name
 
     return _setup_eng
 
+
+def pytest_addoption(parser):
+    """Add the option to run the tests marked as slow"""
+    parser.addoption(
+        "--run-slow", action="store_true", default=False, help="run tests marked as slow"
+    )
+
+
 def pytest_runtest_setup(item):
     """Automatically skip tests if they are marked for only certain backends"""
     if tf_available:
@@ -249,3 +257,7 @@ def pytest_runtest_setup(item):
             pytest.skip("Broken test skipped: {}".format(*mark.args))
         else:
             pytest.skip("Test skipped as corresponding code base is currently broken!")
+
+    # skip slow tests, unless requested
+    if item.get_closest_marker("slow") is not None and not item.config.getoption("--run-slow"):
+        pytest.skip("Slow test skipped, use the --run-slow option to run it")
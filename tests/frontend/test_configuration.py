@@ -399,6 +399,24 @@ class TestGetConfigFilepath:
 
         assert config_filepath == tmpdir.join(filename)
 
+    def test_current_directory_skips_other_lookups(self, tmpdir, monkeypatch):
+        """Test that the remaining directories are not looked up once a
+        configuration file was found in the current directory."""
+        filename = "config.toml"
+
+        with open(tmpdir.join(filename), "w") as f:
+            f.write(TEST_FILE)
+
+        def raise_error(*args):
+            raise ValueError("The user configuration directory was looked up.")
+
+        with monkeypatch.context() as m:
+            m.setattr(os, "getcwd", lambda: tmpdir)
+            m.setattr(conf, "user_config_dir", raise_error)
+            config_filepath = conf.find_config_file(filename=filename)
+
+        assert config_filepath == tmpdir.join(filename)
+
     def test_env_variable(self, monkeypatch, tmpdir):
         """Test that the correct configuration file is found using the correct
         environment variable (SF_CONF).
@@ -503,6 +521,26 @@ class TestLoadConfigFile:
 
         assert loaded_config == EXPECTED_CONFIG
 
+    def test_cached_file_reloaded_after_modification(self, tmpdir):
+        """Test that a configuration file is parsed again once it was modified,
+        and that the cached configuration cannot be mutated by the caller."""
+        filename = tmpdir.join("test_config.toml")
+
+        with open(filename, "w") as f:
+            f.write(TEST_FILE)
+
+        loaded_config = conf.load_config_file(filepath=filename)
+        loaded_config["api"]["hostname"] = "SomeHost"
+
+        assert conf.load_config_file(filepath=filename) == EXPECTED_CONFIG
+
+        with open(filename, "w") as f:
+            f.write(TEST_FILE_ONE_VALUE)
+
+        assert conf.load_config_file(filepath=filename) == {
+            "api": {"authentication_token": authentication_token}
+        }
+
 
 class TestKeepValidOptions:
     def test_only_invalid_options(self):
@@ -829,3 +867,59 @@ class TestSaveConfigToFile:
 
         result_for_new_file = toml.load(filepath)
         assert result_for_new_file == OTHER_EXPECTED_CONFIG
+
+    def test_no_temporary_file_left(self, tmpdir):
+        """Test that saving a configuration file does not leave any temporary
+        files behind in the target directory."""
+        filepath = str(tmpdir.join("config.toml"))
+
+        conf.save_config_to_file(OTHER_EXPECTED_CONFIG, filepath)
+
+        assert os.listdir(str(tmpdir)) == ["config.toml"]
+
+    @pytest.mark.skipif(os.name == "nt", reason="creating symbolic links requires privileges")
+    def test_symlink(self, tmpdir):
+        """Test that saving a configuration file through a symbolic link updates
+        the file that the link points to, and keeps the link."""
+        filepath = str(tmpdir.join("config.toml"))
+        linkpath = str(tmpdir.join("link.toml"))
+
+        with open(filepath, "w") as f:
+            f.write(TEST_FILE)
+        os.symlink(filepath, linkpath)
+
+        conf.save_config_to_file(OTHER_EXPECTED_CONFIG, linkpath)
+
+        assert os.path.islink(linkpath)
+        assert os.path.realpath(linkpath) == os.path.realpath(filepath)
+        assert toml.load(filepath) == OTHER_EXPECTED_CONFIG
+
+    @pytest.mark.skipif(os.name == "nt", reason="POSIX file permissions")
+    def test_permissions(self, tmpdir):
+        """Test that overwriting a configuration file keeps its permissions, and
+        that a new configuration file is only accessible by its owner."""
+        filepath = str(tmpdir.join("config.toml"))
+
+        conf.save_config_to_file(OTHER_EXPECTED_CONFIG, filepath)
+        assert os.stat(filepath).st_mode & 0o777 == 0o600
+
+        os.chmod(filepath, 0o644)
+        conf.save_config_to_file(EXPECTED_CONFIG, filepath)
+        assert os.stat(filepath).st_mode & 0o777 == 0o644
+
+    @pytest.mark.skipif(os.name == "nt", reason="POSIX file permissions")
+    @pytest.mark.skipif(
+        hasattr(os, "geteuid") and os.geteuid() == 0, reason="root bypasses file permissions"
+    )
+    def test_read_only(self, tmpdir):
+        """Test that a read-only configuration file is not overwritten."""
+        filepath = str(tmpdir.join("config.toml"))
+
+        conf.save_config_to_file(OTHER_EXPECTED_CONFIG, filepath)
+        os.chmod(filepath, 0o444)
+
+        with pytest.raises(PermissionError):
+            conf.save_config_to_file(EXPECTED_CONFIG, filepath)
+
+        assert toml.load(filepath) == OTHER_EXPECTED_CONFIG
+        assert os.listdir(str(tmpdir)) == ["config.toml"]
@@ -12,20 +12,46 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 r"""Unit tests for tdmprogram.py"""
+from functools import lru_cache
+
 import pytest
 import numpy as np
 import strawberryfields as sf
 from strawberryfields import ops
 from strawberryfields.tdm import tdmprogram
 
-# make test deterministic
-np.random.seed(42)
 
+@pytest.fixture(autouse=True)
+def seed():
+    """Make each test deterministic, independently of the order in which the tests are run."""
+    np.random.seed(42)
+
+
+@pytest.fixture(autouse=True)
+def default_hbar(monkeypatch):
+    """The expected nullifier variances assume hbar=2, which other test modules may have changed."""
+    monkeypatch.setattr(sf, "hbar", 2)
+
+
+@pytest.fixture(scope="module")
+def gaussian_engine():
+    """Gaussian engine shared by the tests in this module."""
+    return sf.Engine("gaussian")
 
-def singleloop(r, alpha, phi, theta, copies, shift="default", hbar=2):
+
+@pytest.fixture
+def eng(gaussian_engine):
+    """Shared Gaussian engine, cleared of the programs run on it after each test."""
+    yield gaussian_engine
+    if gaussian_engine.run_progs:
+        gaussian_engine.reset()
+
+
+def singleloop(eng, r, alpha, phi, theta, copies, shift="default", hbar=2):
     """Single delay loop with program.
 
     Args:
+        eng (.LocalEngine): engine to run the program on
         r (float): squeezing parameter
         alpha (Sequence[float]): beamsplitter angles
         phi (Sequence[float]): rotation angles
@@ -41,13 +67,27 @@ def singleloop(r, alpha, phi, theta, copies, shift="default", hbar=2):
         ops.BSgate(p[0]) | (q[0], q[1])
         ops.Rgate(p[1]) | q[1]
         ops.MeasureHomodyne(p[2]) | q[0]
-    eng = sf.Engine("gaussian")
     result = eng.run(prog, hbar=hbar)
+    # clear the program, such that the engine can run the next one from scratch
+    eng.reset()
 
     return result.samples[0]
 
 
-def test_number_of_copies_must_be_integer():
+@lru_cache(maxsize=8)
+def _half_theta(n):
+    """Homodyne angles measuring the first half of ``n`` time bins in X and the second half in P.
+
+    Args:
+        n (int): number of time bins
+
+    Returns:
+        tuple[float]: the measurement angles
+    """
+    return (0,) * (n // 2) + (np.pi / 2,) * (n // 2)
+
+
+def test_number_of_copies_must_be_integer(eng):
     """Checks number of copies is integer"""
     sq_r = 1.0
     N = 3
@@ -57,10 +97,10 @@ def test_number_of_copies_must_be_integer():
     phi = [np.pi / 2, 0] * c
     theta = [0, 0] + [0, np.pi / 2] + [np.pi / 2, 0] + [np.pi / 2, np.pi / 2]
     with pytest.raises(TypeError, match="Number of copies must be a positive integer"):
-        singleloop(sq_r, alpha, phi, theta, copies)
+        singleloop(eng, sq_r, alpha, phi, theta, copies)
 
 
-def test_gates_equal_length():
+def test_gates_equal_length(eng):
     """Checks gate list parameters have same length"""
     sq_r = 1.0
     N = 3
@@ -70,10 +110,10 @@ def test_gates_equal_length():
     phi = [np.pi / 2, 0] * c
     theta = [0, 0] + [0, np.pi / 2] + [np.pi / 2, 0] + [np.pi / 2]
     with pytest.raises(ValueError, match="Gate-parameter lists must be of equal length."):
-        singleloop(sq_r, alpha, phi, theta, copies)
+        singleloop(eng, sq_r, alpha, phi, theta, copies)
 
 
-def test_at_least_one_measurement():
+def test_at_least_one_measurement(eng):
     """Checks circuit has at least one measurement operator"""
     sq_r = 1.0
     N = 3
@@ -86,11 +126,10 @@ def test_at_least_one_measurement():
             ops.Sgate(sq_r, 0) | q[2]
             ops.BSgate(p[0]) | (q[1], q[2])
             ops.Rgate(p[1]) | q[2]
-        eng = sf.Engine("gaussian")
         result = eng.run(prog)
 
 
-def test_spatial_modes_number_of_measurements_match():
+def test_spatial_modes_number_of_measurements_match(eng):
     """Checks number of spatial modes matches number of measurements"""
     sq_r = 1.0
     N = 3
@@ -105,14 +144,12 @@ def test_spatial_modes_number_of_measurements_match():
             ops.BSgate(p[0]) | (q[1], q[2])
             ops.Rgate(p[1]) | q[2]
             ops.MeasureHomodyne(p[2]) | q[0]
-        eng = sf.Engine("gaussian")
         result = eng.run(prog)
 
 
-def test_shift_by_specified_amount():
+def test_shift_by_specified_amount(eng):
     """Checks that shifting by 1 is equivalent to shift='end' for a program
     with one spatial mode"""
-    np.random.seed(42)
     sq_r = 1.0
     N = 3
     copies = 1
@@ -120,34 +157,97 @@ def test_shift_by_specified_amount():
     phi = [0] * 4
     theta = [0] * 4
     np.random.seed(42)
-    x = singleloop(sq_r, alpha, phi, theta, copies)
+    x = singleloop(eng, sq_r, alpha, phi, theta, copies)
     np.random.seed(42)
-    y = singleloop(sq_r, alpha, phi, theta, copies, shift=1)
+    y = singleloop(eng, sq_r, alpha, phi, theta, copies, shift=1)
     assert np.allclose(x, y)
 
 
+def test_shift_with_large_number_of_spatial_modes():
+    """Checks that the default shift is applied correctly when the least common multiple
+    of the number of concurrent modes per spatial mode exceeds the int64 range"""
+    N = [40, 57, 56, 35, 66, 48, 41, 58, 59, 9, 60, 54, 2, 17, 79, 73, 34, 13, 43]
+    timebins = 3
+    starts = np.cumsum([0] + N[:-1])
+
+    prog = tdmprogram.TDMProgram(N)
+    with prog.context([0] * timebins, [0] * timebins) as (p, q):
+        for start in starts:
+            ops.MeasureHomodyne(p[0]) | q[start]
+
+    measured = [cmd.reg[0].ind for cmd in prog.circuit]
+    expected = [start + t % n for t in range(timebins) for start, n in zip(starts, N)]
+    assert measured == expected
+
+
+def test_many_spatial_modes():
+    """Checks that the number of measurements is compared by value with the number of spatial
+    modes, which also holds for more than 256 spatial modes"""
+    N = [1] * 257
+
+    prog = tdmprogram.TDMProgram(N)
+    with prog.context([0], [0]) as (p, q):
+        for i in range(len(N)):
+            ops.MeasureHomodyne(p[0]) | q[i]
+
+    assert prog.spatial_modes == 257
+
+
+def test_shift_with_large_coprime_bands():
+    """Checks that the default shift wraps around correctly for large spatial modes whose
+    numbers of concurrent modes are coprime, when only a few register indices are used"""
+    N = [200, 199]
+    timebins = 500
+
+    prog = tdmprogram.TDMProgram(N)
+    with prog.context([0] * timebins, [0] * timebins) as (p, q):
+        ops.BSgate(0.5) | (q[3], q[250])
+        ops.MeasureHomodyne(p[0]) | q[0]
+        ops.MeasureHomodyne(p[1]) | q[200]
+
+    expected = []
+    for t in range(timebins):
+        expected += [(3 + t) % 200, 200 + (50 + t) % 199, t % 200, 200 + t % 199]
+    assert [r.ind for cmd in prog.circuit for r in cmd.reg] == expected
+
+
+def test_reshape_samples():
+    """Checks that the samples are assigned to the measured modes in the order in which they
+    were measured, without modifying the raw samples"""
+    all_samples = {0: [0, 2, 4, 6], 1: [1, 5], 2: [3, 7]}
+    new_samples = tdmprogram.reshape_samples(all_samples, [0, 1], [1, 2])
+
+    assert new_samples == {0: [0, 2, 4, 6], 1: [1, 3, 5, 7]}
+    assert all_samples == {0: [0, 2, 4, 6], 1: [1, 5], 2: [3, 7]}
+
+
+def test_reshape_samples_empty():
+    """Checks that reshaping the samples of a program without any time bins returns
+    an empty dictionary"""
+    assert tdmprogram.reshape_samples({}, [0, 1], [1, 2]) == {}
+
+
 def test_str_tdm_method():
     """Testing the string method"""
     prog = tdmprogram.TDMProgram(N=1)
     assert prog.__str__() == "<TDMProgram: concurrent modes=1, time bins=0, spatial modes=0>"
 
 
-def test_epr():
+def test_epr(eng):
     """Generates an EPR state and checks that the correct correlations (noise reductions) are observed
     from the samples"""
-    np.random.seed(42)
     sq_r = 1.0
     c = 4
     copies = 200
 
     # This will generate c EPRstates per copy. I chose c = 4 because it allows us to make 4 EPR pairs per copy that can each be measured in different basis permutations.
-    alpha = [np.pi / 4, 0] * c
-    phi = [0, np.pi / 2] * c
+    alpha = np.tile([np.pi / 4, 0], c)
+    phi = np.tile([0, np.pi / 2], c)
 
     # Measurement of 4 subsequent EPR states in XX, XP, PX, PP to investigate nearest-neighbour correlations in all basis permutations
     theta = [0, 0] + [0, np.pi / 2] + [np.pi / 2, 0] + [np.pi / 2, np.pi / 2]  #
 
-    x = singleloop(sq_r, alpha, phi, theta, copies)
+    x = singleloop(eng, sq_r, alpha, phi, theta, copies)
 
     X0 = x[0::8]
     X1 = x[1::8]
@@ -158,89 +258,93 @@ def test_epr():
     P2 = x[6::8]
     P3 = x[7::8]
     atol = 5 / np.sqrt(copies)
-    minusstdX1X0 = (X1 - X0).std() / np.sqrt(2)
-    plusstdX1X0 = (X1 + X0).std() / np.sqrt(2)
+
+    # buffer reused for the sums and differences of the quadratures
+    tmp = np.empty_like(X0)
+
+    minusstdX1X0 = np.subtract(X1, X0, out=tmp).std() / np.sqrt(2)
+    plusstdX1X0 = np.add(X1, X0, out=tmp).std() / np.sqrt(2)
     squeezed_std = np.exp(-sq_r)
     assert np.allclose(minusstdX1X0, squeezed_std, atol=atol)
     assert np.allclose(plusstdX1X0, 1 / squeezed_std, atol=atol)
-    minusstdP2P3 = (P2 - P3).std() / np.sqrt(2)
-    plusstdP2P3 = (P2 + P3).std() / np.sqrt(2)
+    minusstdP2P3 = np.subtract(P2, P3, out=tmp).std() / np.sqrt(2)
+    plusstdP2P3 = np.add(P2, P3, out=tmp).std() / np.sqrt(2)
     assert np.allclose(minusstdP2P3, 1 / squeezed_std, atol=atol)
     assert np.allclose(plusstdP2P3, squeezed_std, atol=atol)
-    minusstdP0X2 = (P0 - X2).std()
-    plusstdP0X2 = (P0 + X2).std()
+    minusstdP0X2 = np.subtract(P0, X2, out=tmp).std()
+    plusstdP0X2 = np.add(P0, X2, out=tmp).std()
     expected = 2 * np.sinh(sq_r) ** 2
     assert np.allclose(minusstdP0X2, expected, atol=atol)
     assert np.allclose(plusstdP0X2, expected, atol=atol)
-    minusstdX3P1 = (X3 - P1).std()
-    plusstdX3P1 = (X3 + P1).std()
+    minusstdX3P1 = np.subtract(X3, P1, out=tmp).std()
+    plusstdX3P1 = np.add(X3, P1, out=tmp).std()
     assert np.allclose(minusstdX3P1, expected, atol=atol)
     assert np.allclose(plusstdX3P1, expected, atol=atol)
 
 
-def test_ghz():
+@pytest.mark.parametrize("copies", [250, pytest.param(1000, marks=pytest.mark.slow)])
+def test_ghz(eng, copies):
     """Generates a GHZ state and checks that the correct correlations (noise reductions) are observed
     from the samples
     See Eq. 5 of https://advances.sciencemag.org/content/5/5/eaaw4530
     """
     # Set up the circuit
-    np.random.seed(42)
     n = 10
     vac_modes = 1
-    copies = 1000
     sq_r = 5
-    alpha = [np.arccos(np.sqrt(1 / (n - i + 1))) if i != n + 1 else 0 for i in range(n + vac_modes)]
+    i = np.arange(n + vac_modes)
+    alpha = np.arccos(np.sqrt(1 / (n - i + 1)))
     alpha[0] = 0.0
     phi = [0] * (n + vac_modes)
     phi[0] = np.pi / 2
 
-    # Measuring X nullifier
-    theta = [0] * (n + vac_modes)
-    samples_X = singleloop(sq_r, alpha, phi, theta, copies)
-    reshaped_samples_X = np.array(samples_X).reshape([copies, n + vac_modes])
+    # Each copy generates two GHZ states, measuring the X nullifier on the
+    # first one and the P nullifier on the second one
+    theta = [0] * (n + vac_modes) + [np.pi / 2] * (n + vac_modes)
+    samples = singleloop(eng, sq_r, np.tile(alpha, 2), phi * 2, theta, copies)
+    reshaped_samples = np.asarray(samples).reshape([copies, 2, n + vac_modes])
+    reshaped_samples_X = reshaped_samples[:, 0]
+    reshaped_samples_P = reshaped_samples[:, 1]
 
     # We will check that the x of all the modes equal the x of the last one
-    nullifier_X = lambda sample: (sample - sample[-1])[vac_modes:-1]
-    val_nullifier_X = np.var([nullifier_X(x) for x in reshaped_samples_X], axis=0)
+    nullifier_X = reshaped_samples_X[:, vac_modes:-1] - reshaped_samples_X[:, -1:]
+    val_nullifier_X = nullifier_X.var(axis=0)
     assert np.allclose(val_nullifier_X, 2 * np.exp(-2 * sq_r), rtol=5 / np.sqrt(copies))
 
-    # Measuring P nullifier
-    theta = [np.pi / 2] * (n + vac_modes)
-    samples_P = singleloop(sq_r, alpha, phi, theta, copies)
-
     # We will check that the sum of all the p is equal to zero
-    reshaped_samples_P = np.array(samples_P).reshape([copies, n + vac_modes])
-    nullifier_P = lambda sample: np.sum(sample[vac_modes:])
-    val_nullifier_P = np.var([nullifier_P(p) for p in reshaped_samples_P], axis=0)
+    nullifier_P = reshaped_samples_P[:, vac_modes:].sum(axis=1)
+    val_nullifier_P = nullifier_P.var()
     assert np.allclose(val_nullifier_P, n * np.exp(-2 * sq_r), rtol=5 / np.sqrt(copies))
 
 
-def test_one_dimensional_cluster():
+@pytest.mark.parametrize("copies", [250, pytest.param(1000, marks=pytest.mark.slow)])
+def test_one_dimensional_cluster(eng, copies):
     """Test that the nullifier have the correct value in the experiment described in
     See Eq. 10 of https://advances.sciencemag.org/content/5/5/eaaw4530
     """
-    np.random.seed(42)
     n = 20
-    copies = 1000
     sq_r = 3
     alpha_c = np.arccos(np.sqrt((np.sqrt(5) - 1) / 2))
     alpha = [alpha_c] * n
     alpha[0] = 0.0
     phi = [np.pi / 2] * n
     theta = [0, np.pi / 2] * (n // 2)  # Note that we measure x for mode i and the p for mode i+1.
-    reshaped_samples = np.array(singleloop(sq_r, alpha, phi, theta, copies)).reshape(copies, n)
-    nullifier = lambda x: np.array([-x[i - 2] + x[i - 1] - x[i] for i in range(2, len(x) - 2, 2)])[1:]
-    nullifier_samples = np.array([nullifier(y) for y in reshaped_samples])
-    delta = np.var(nullifier_samples, axis=0)
+    samples = singleloop(eng, sq_r, alpha, phi, theta, copies)
+    reshaped_samples = np.asarray(samples).reshape(copies, n)
+    nullifier_samples = (
+        -reshaped_samples[:, 0 : n - 4 : 2]
+        + reshaped_samples[:, 1 : n - 3 : 2]
+        - reshaped_samples[:, 2 : n - 2 : 2]
+    )[:, 1:]
+    delta = nullifier_samples.var(axis=0)
     assert np.allclose(delta, 3 * np.exp(-2 * sq_r), rtol=5 / np.sqrt(copies))
 
 
-def test_one_dimensional_cluster_tokyo():
+def test_one_dimensional_cluster_tokyo(eng):
     """
     One-dimensional temporal-mode cluster state as demonstrated in
     https://aip.scitation.org/doi/pdf/10.1063/1.4962732
     """
-    np.random.seed(42)
     sq_r = 5
     N = 3  # concurrent modes
 
@@ -248,7 +352,7 @@ def test_one_dimensional_cluster_tokyo():
     copies = 1
 
     # first half of cluster state measured in X, second half in P
-    theta1 = [0] * int(n / 2) + [np.pi / 2] * int(n / 2)  # measurement angles for detector A
+    theta1 = _half_theta(n)  # measurement angles for detector A
     theta2 = theta1  # measurement angles for detector B
 
     prog = tdmprogram.TDMProgram(N=[1, 2])
@@ -260,11 +364,10 @@ def test_one_dimensional_cluster_tokyo():
         ops.BSgate(np.pi / 4) | (q[0], q[1])
         ops.MeasureHomodyne(p[0]) | q[0]
         ops.MeasureHomodyne(p[1]) | q[1]
-    eng = sf.Engine("gaussian")
     result = eng.run(prog)
 
-    xA = result.all_samples[0]
-    xB = result.all_samples[1]
+    xA = np.array(result.all_samples[0])
+    xB = np.array(result.all_samples[1])
 
     X_A = xA[: n // 2]  # X samples from detector A
     P_A = xA[n // 2 :]  # P samples from detector A
@@ -273,8 +376,8 @@ def test_one_dimensional_cluster_tokyo():
 
     # nullifiers defined in https://aip.scitation.org/doi/pdf/10.1063/1.4962732, Eqs. (1a) and (1b)
     ntot = len(X_A) - 1
-    nX = np.array([X_A[i] + X_B[i] + X_A[i + 1] - X_B[i + 1] for i in range(ntot)])
-    nP = np.array([P_A[i] + P_B[i] - P_A[i + 1] + P_B[i + 1] for i in range(ntot)])
+    nX = X_A[:ntot] + X_B[:ntot] + X_A[1:] - X_B[1:]
+    nP = P_A[:ntot] + P_B[:ntot] - P_A[1:] + P_B[1:]
 
     nXvar = np.var(nX)
     nPvar = np.var(nP)
@@ -283,18 +386,17 @@ def test_one_dimensional_cluster_tokyo():
     assert np.allclose(nPvar, 4 * np.exp(-2 * sq_r), rtol=5 / np.sqrt(n))
 
 
-def test_two_dimensional_cluster_denmark():
+@pytest.mark.parametrize("n", [100, pytest.param(400, marks=pytest.mark.slow)])
+def test_two_dimensional_cluster_denmark(eng, n):
     """
     Two-dimensional temporal-mode cluster state as demonstrated in https://arxiv.org/pdf/1906.08709
     """
-    np.random.seed(42)
     sq_r = 3
     delay1 = 1  # number of timebins in the short delay line
     delay2 = 12  # number of timebins in the long delay line
-    n = 400  # number of timebins
     # Size of cluste is n x delay2
     # first half of cluster state measured in X, second half in P
-    theta_A = [0] * int(n / 2) + [np.pi / 2] * int(n / 2)  # measurement angles for detector A
+    theta_A = _half_theta(n)  # measurement angles for detector A
     theta_B = theta_A  # measurement angles for detector B
 
     # 2D cluster
@@ -308,12 +410,11 @@ def test_two_dimensional_cluster_denmark():
         ops.BSgate(np.pi / 4, np.pi) | (q[delay1], q[0])
         ops.MeasureHomodyne(p[1]) | q[0]
         ops.MeasureHomodyne(p[0]) | q[delay1]
-    eng = sf.Engine("gaussian")
     result = eng.run(prog)
     samples = result.all_samples
 
-    xA = result.all_samples[0]
-    xB = result.all_samples[1]
+    xA = np.array(result.all_samples[0])
+    xB = np.array(result.all_samples[1])
 
     X_A = xA[: n // 2]  # X samples from detector A
     P_A = xA[n // 2 :]  # P samples from detector A
@@ -323,8 +424,26 @@ def test_two_dimensional_cluster_denmark():
     # nullifiers defined in https://arxiv.org/pdf/1906.08709.pdf, Eqs. (1) and (2)
     N = delay2
     ntot = len(X_A) - delay2 - 1
-    nX = np.array([X_A[k] + X_B[k] - X_A[k + 1] - X_B[k + 1] - X_A[k + N] + X_B[k + N] - X_A[k + N + 1] + X_B[k + N + 1] for k in range(ntot)])
-    nP = np.array([P_A[k] + P_B[k] + P_A[k + 1] + P_B[k + 1] - P_A[k + N] + P_B[k + N] + P_A[k + N + 1] - P_B[k + N + 1] for k in range(ntot)])
+    nX = (
+        X_A[:ntot]
+        + X_B[:ntot]
+        - X_A[1 : ntot + 1]
+        - X_B[1 : ntot + 1]
+        - X_A[N : N + ntot]
+        + X_B[N : N + ntot]
+        - X_A[N + 1 : N + 1 + ntot]
+        + X_B[N + 1 : N + 1 + ntot]
+    )
+    nP = (
+        P_A[:ntot]
+        + P_B[:ntot]
+        + P_A[1 : ntot + 1]
+        + P_B[1 : ntot + 1]
+        - P_A[N : N + ntot]
+        + P_B[N : N + ntot]
+        + P_A[N + 1 : N + 1 + ntot]
+        - P_B[N + 1 : N + 1 + ntot]
+    )
     nXvar = np.var(nX)
     nPvar = np.var(nP)
 
@@ -332,7 +451,8 @@ def test_two_dimensional_cluster_denmark():
     assert np.allclose(nPvar, 8 * np.exp(-2 * sq_r), rtol=5 / np.sqrt(ntot))
 
 
-def test_two_dimensional_cluster_tokyo():
+@pytest.mark.parametrize("n", [100, pytest.param(400, marks=pytest.mark.slow)])
+def test_two_dimensional_cluster_tokyo(eng, n):
     """
     Two-dimensional temporal-mode cluster state as demonstrated by Universtiy of Tokyo. See: https://arxiv.org/pdf/1903.03918.pdf
     """
@@ -353,8 +473,7 @@ def test_two_dimensional_cluster_tokyo():
     sq_r = 5
 
     # first half of cluster state measured in X, second half in P
-    n = 400  # number of timebins
-    theta_A = [0] * int(n / 2) + [np.pi / 2] * int(n / 2)  # measurement angles for detector A
+    theta_A = _half_theta(n)  # measurement angles for detector A
     theta_B = theta_A  # measurement angles for detector B
     theta_C = theta_A
     theta_D = theta_A
@@ -382,14 +501,13 @@ def test_two_dimensional_cluster_tokyo():
         ops.MeasureHomodyne(p[2]) | q[3]
         ops.MeasureHomodyne(p[3]) | q[9]
 
-    eng = sf.Engine("gaussian")
     result = eng.run(prog)
     samples = result.all_samples
 
-    xA = result.all_samples[0]
-    xB = result.all_samples[1]
-    xC = result.all_samples[3]
-    xD = result.all_samples[9]
+    xA = np.array(result.all_samples[0])
+    xB = np.array(result.all_samples[1])
+    xC = np.array(result.all_samples[3])
+    xD = np.array(result.all_samples[9])
 
     X_A = xA[: n // 2]  # X samples from detector A
     P_A = xA[n // 2 :]  # P samples from detector A
@@ -406,10 +524,18 @@ def test_two_dimensional_cluster_tokyo():
     N = delayC
     # nullifiers defined in https://arxiv.org/pdf/1903.03918.pdf, Fig. S5
     ntot = len(X_A) - N - 1
-    nX1 = np.array([X_A[k] + X_B[k] - np.sqrt(1 / 2) * (-X_A[k + 1] + X_B[k + 1] + X_C[k + N] + X_D[k + N]) for k in range(ntot)])
-    nX2 = np.array([X_C[k] - X_D[k] - np.sqrt(1 / 2) * (-X_A[k + 1] + X_B[k + 1] - X_C[k + N] - X_D[k + N]) for k in range(ntot)])
-    nP1 = np.array([P_A[k] + P_B[k] + np.sqrt(1 / 2) * (-P_A[k + 1] + P_B[k + 1] + P_C[k + N] + P_D[k + N]) for k in range(ntot)])
-    nP2 = np.array([P_C[k] - P_D[k] + np.sqrt(1 / 2) * (-P_A[k + 1] + P_B[k + 1] - P_C[k + N] - P_D[k + N]) for k in range(ntot)])
+    sqrt_half = np.sqrt(1 / 2)
+
+    # terms shared by both X nullifiers and by both P nullifiers
+    X_AB = -X_A[1 : ntot + 1] + X_B[1 : ntot + 1]
+    X_CD = X_C[N : N + ntot] + X_D[N : N + ntot]
+    P_AB = -P_A[1 : ntot + 1] + P_B[1 : ntot + 1]
+    P_CD = P_C[N : N + ntot] + P_D[N : N + ntot]
+
+    nX1 = X_A[:ntot] + X_B[:ntot] - sqrt_half * (X_AB + X_CD)
+    nX2 = X_C[:ntot] - X_D[:ntot] - sqrt_half * (X_AB - X_CD)
+    nP1 = P_A[:ntot] + P_B[:ntot] + sqrt_half * (P_AB + P_CD)
+    nP2 = P_C[:ntot] - P_D[:ntot] + sqrt_half * (P_AB - P_CD)
 
     nX1var = np.var(nX1)
     nX2var = np.var(nX2)